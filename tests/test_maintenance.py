@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import io
-import fnmatch
+import json
 import unittest
 import unittest.mock
 import subprocess
@@ -49,13 +49,24 @@ UPC_MAINT_VMS = [[PER_MAINT_VMS[0], T1, T2, "TRUE", "SCHEDULED"],
                 [PER_MAINT_VMS[11], T1, T2, "FALSE", "SCHEDULED"],
                 [PER_MAINT_VMS[12], T1, T2, "TRUE", "UNSCHEDULED"],
                 [PER_MAINT_VMS[13], T1, T2, "FALSE", "UNSCHEDULED"]]
+# gcloud json output for the instances above
+MAINT_INSTANCES = [{"name": vm,
+                    "scheduling": {"maintenanceInterval": "PERIODIC"}}
+                   for vm in PER_MAINT_VMS]
+for vm, inst in zip(PER_MAINT_VMS, MAINT_INSTANCES):
+    for upc in UPC_MAINT_VMS:
+        if upc[0] == vm:
+            inst["upcomingMaintenance"] = {
+                "startTimeWindow": {"earliest": upc[1], "latest": upc[2]},
+                "canReschedule": upc[3] == "TRUE",
+                "type": upc[4]}
 VERSION_RES = """
 {
     "alpha": "2023.11.10"
 }
 """
 
-def subprocess_replace(cmd, shell, check, universal_newlines, stdout,
+def subprocess_replace(cmd, check, universal_newlines, stdout,
                        stderr) -> subprocess.CompletedProcess:
     res = subprocess.CompletedProcess("", 0)
     res.stdout = ""
@@ -66,19 +77,14 @@ def subprocess_replace(cmd, shell, check, universal_newlines, stdout,
         for vm in PER_MAINT_VMS[10:]:
             res.stdout += f"{vm}\n"
         return res
-    if fnmatch.fnmatch(cmd, maintenance.PRJ_CMD.format("*")):
-        if not any(prj in cmd for prj in list(VALID_PRJS.values())):
+    if cmd[:-1] == maintenance.PRJ_CMD:
+        if cmd[-1] not in VALID_PRJS.values():
             res.returncode = 1
         return res
-    if fnmatch.fnmatch(cmd, maintenance.PER_MAINT_CMD.format("*")):
-        if VALID_PRJS["scheduled"] in cmd:
-            for vm in PER_MAINT_VMS:
-                res.stdout += f"{vm}\n"
-        return res
-    if fnmatch.fnmatch(cmd, maintenance.UPC_MAINT_CMD.format("*")):
-        if VALID_PRJS["scheduled"] in cmd:
-            for vm in UPC_MAINT_VMS:
-                res.stdout += f"{vm[0]}\t{vm[1]}\t{vm[2]}\t{vm[3]}\t{vm[4]}\n"
+    if cmd[:-1] == maintenance.MAINT_CMD:
+        res.stdout = "[]"
+        if cmd[-1] == f"--project={VALID_PRJS['scheduled']}":
+            res.stdout = json.dumps(MAINT_INSTANCES)
         return res
 
     return res
@@ -124,9 +130,37 @@ class TestProgram(unittest.TestCase):
 
     def test_slurm_filter(self, mock_subprocess, mock_stdout):
         maint = maintenance.node_maintenace_factory(VALID_PRJS["scheduled"],
-                                                    check_maint = True,
                                                     slurm = True)
         err_msg = "Correct number of slurm nodes not found"
         self.assertEqual(len(maint.slurm_nodes), VM_TYPE_CNT, err_msg)
         self.assertEqual(len(maint.per_maint_vms), VM_TYPE_CNT, err_msg)
         self.assertEqual(len(maint.upc_maint_vms), 4, err_msg)
+
+    def test_single_listing(self, mock_subprocess, mock_stdout):
+        maintenance.node_maintenace_factory(VALID_PRJS["scheduled"])
+        listings = [c for c in mock_subprocess.call_args_list
+                    if c.args[0][:-1] == maintenance.MAINT_CMD]
+        self.assertEqual(len(listings), 1,
+                         "Maintenance queries should share one listing")
+
+    def test_listing_contents(self, mock_subprocess, mock_stdout):
+        maint = maintenance.node_maintenace_factory(VALID_PRJS["scheduled"])
+        self.assertCountEqual(maint.per_maint_vms, PER_MAINT_VMS)
+        expected = [[vm[0], vm[1], vm[2], str(vm[3] == "TRUE"), vm[4]]
+                    for vm in UPC_MAINT_VMS]
+        self.assertEqual(maint.upc_maint_vms, expected)
+
+        # Missing fields keep their column instead of shifting the row
+        partial = [{"name": "vm_partial",
+                    "upcomingMaintenance": {"type": "SCHEDULED"}}]
+        self.assertEqual(maintenance.get_upcoming_maintenance(partial),
+                         [["vm_partial", "", "", "", "SCHEDULED"]])
+        self.assertEqual(maintenance.get_maintenance_nodes(partial), [])
+
+    def test_update_refreshes(self, mock_subprocess, mock_stdout):
+        maint = maintenance.node_maintenace_factory(VALID_PRJS["scheduled"])
+        maint.update_instances()
+        listings = [c for c in mock_subprocess.call_args_list
+                    if c.args[0][:-1] == maintenance.MAINT_CMD]
+        self.assertEqual(len(listings), 2,
+                         "update_instances should re-run the listing")
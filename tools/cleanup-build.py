@@ -14,7 +14,10 @@
 # limitations under the License.
 import argparse
 import os
+import selectors
 import shutil
+import subprocess
+import sys
 import tarfile
 
 # pip install google-cloud-storage
@@ -23,21 +26,22 @@ from google.cloud import storage
 DESCRIPTION = """
 This tool automates some manual tasks for cleaning up failed builds.
 When provided with the uri for a deployment folder this tool will:
-- download the tar locally
-- extract the tar into a deployment folder
+- stream the tar from the bucket and extract it into a deployment folder
 - destroy the deployment
-- remove the tar and deployment folder
+- remove the deployment folder
 
 Usage:
 tools/cleanup-build.py my-project gs://my-bucket/test-name/build.tgz
 """
 
-def cp_from_gcs(gcs_source_uri: str, local_destination_path: str, project_id: str) -> str:
-    """Downloads a file from Google Cloud Storage to a local destination.
+def unpack_from_gcs(gcs_source_uri: str, destination_folder: str, project_id: str) -> str:
+    """Streams a tgz from Google Cloud Storage and extracts it without a local copy.
     Args:
         gcs_source_uri: The path to the file in Google Cloud Storage using the gs:// notation.
-        local_destination_path: The local path to save the file to.
+        destination_folder: The local folder to extract the archive into.
         project_id: The Google Cloud project ID.
+    Returns:
+        The path of the extracted deployment folder.
     """
 
     storage_client = storage.Client(project=project_id)
@@ -45,26 +49,39 @@ def cp_from_gcs(gcs_source_uri: str, local_destination_path: str, project_id: st
     path = "/".join(gcs_source_uri.split("/")[3:])
     filename = gcs_source_uri.split('/')[-1]
     blob = bucket.blob(path)
-    destination = f"{local_destination_path}/{filename}"
-    blob.download_to_filename(destination)
-    return destination
-
-def unpack_tgz(tar_file: str, destination_folder: str):
-  with tarfile.open(tar_file, "r:gz") as tar:
-    tar.extractall(destination_folder)
+    # "r|gz" reads the archive strictly sequentially, so it can consume the
+    # download stream directly
+    with blob.open("rb") as src, tarfile.open(fileobj=src, mode="r|gz") as tar:
+        tar.extractall(destination_folder)
+    deployment_folder, _ = os.path.splitext(filename)
+    return os.path.join(destination_folder, deployment_folder)
 
 def destroy(deployment_folder: str) -> bool:
-    import subprocess
-    import sys
-    process = subprocess.Popen(["./ghpc" , "destroy", deployment_folder, "--auto-approve"], stdout=subprocess.PIPE)
-    for line in iter(lambda: process.stdout.read(1), b""):
-        sys.stdout.buffer.write(line)
+    process = subprocess.Popen(["./ghpc" , "destroy", deployment_folder, "--auto-approve"],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # Drain both pipes as data arrives so neither fills up and stalls ghpc;
+    # both are echoed live and stderr is also kept for the failure report.
+    stderr = []
+    sel = selectors.DefaultSelector()
+    try:
+        sel.register(process.stdout, selectors.EVENT_READ, sys.stdout.buffer)
+        sel.register(process.stderr, selectors.EVENT_READ, sys.stderr.buffer)
+        while sel.get_map():
+            for key, _ in sel.select():
+                chunk = os.read(key.fd, 1 << 16)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    continue
+                key.data.write(chunk)
+                key.data.flush()
+                if key.fileobj is process.stderr:
+                    stderr.append(chunk)
+    finally:
+        sel.close()
     process.wait()
 
     if process.returncode:
-        stdout, stderr = process.communicate()
-        print(f'stdout: {stdout}')
-        print(f'stderr: {stderr}\n\n')
+        print(f'stderr: {b"".join(stderr).decode(errors="replace")}\n\n')
         print("Deployment destroy failed. Command to manually destroy:")
         print(f"./ghpc destroy {deployment_folder} --auto-approve")
         return False
@@ -78,17 +95,12 @@ def main():
     parser.add_argument("gcs_tar_path", help="The path to the GCS tar file.")
     args = parser.parse_args()
 
-    print('Downloading tgz file')
-    tgz_file = cp_from_gcs(args.gcs_tar_path, ".", args.project_id)
-
-    print('Extracting tgz file')
-    deployment_folder, _ = os.path.splitext(tgz_file)
-    unpack_tgz(tgz_file, os.path.dirname(tgz_file))
+    print('Downloading and extracting tgz file')
+    deployment_folder = unpack_from_gcs(args.gcs_tar_path, ".", args.project_id)
 
     print('Destroying deployment')
     if destroy(deployment_folder):
         print('Cleaning up')
-        os.remove(tgz_file)
         shutil.rmtree(deployment_folder)
 
 if __name__ == "__main__":
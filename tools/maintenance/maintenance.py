@@ -30,21 +30,25 @@ USAGE = """
 tools/maintenance/maintenance.py -p <PROJECT_ID> [-n <regex string>] [-m] [-s]
 """
 
-UPC_MAINT_CMD = "gcloud alpha compute instances list --project={}" \
-                " --filter='upcomingMaintenance:*' --format='value(name," \
-                "upcomingMaintenance.startTimeWindow.earliest," \
-                "upcomingMaintenance.startTimeWindow.latest," \
-                "upcomingMaintenance.canReschedule,upcomingMaintenance.type)'"
-PER_MAINT_CMD = "gcloud alpha compute instances list --project={}" \
-                " --filter=scheduling.maintenanceInterval:PERIODIC " \
-                " --format='value(name)'"
-VER_CMD = "gcloud version --format='json(\"alpha\")'"
-PRJ_CMD = "gcloud projects describe {}"
-SLURM_CMD = "sinfo --format=%n --noheader"
-
-def run_command(cmd: str, err_msg: str = None) -> subprocess.CompletedProcess:
-    res = subprocess.run(cmd, shell=True, universal_newlines=True, check=False,
-                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+# A single listing covers both queries; the project flag is appended at the
+# call site
+MAINT_CMD = ["gcloud", "alpha", "compute", "instances", "list",
+             "--filter=upcomingMaintenance:* OR "
+             "scheduling.maintenanceInterval:PERIODIC",
+             "--format=json(name,scheduling.maintenanceInterval,"
+             "upcomingMaintenance)"]
+VER_CMD = ["gcloud", "version", "--format=json(\"alpha\")"]
+PRJ_CMD = ["gcloud", "projects", "describe"]
+SLURM_CMD = ["sinfo", "--format=%n", "--noheader"]
+
+def run_command(cmd: List[str],
+                err_msg: str = None) -> subprocess.CompletedProcess:
+    try:
+        res = subprocess.run(cmd, universal_newlines=True, check=False,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError as e:
+        # Without a shell a missing binary raises instead of exiting with 127
+        raise subprocess.SubprocessError(f"{err_msg}:\n{e}") from e
     if res.returncode != 0:
         raise subprocess.SubprocessError(f"{err_msg}:\n{res.stderr}")
 
@@ -60,19 +64,30 @@ def check_gcloud_components() -> None:
                    " version list"
         raise LookupError(err_msg)
 
-def get_maintenance_nodes(project: str) -> List[str]:
-    err_msg = "Error getting VMs that have scheduled maintenance"
-    res = run_command(PER_MAINT_CMD.format(project), err_msg)
+def get_maintenance_instances(project: str) -> List[dict]:
+    err_msg = "Error getting VMs with maintenance information"
+    res = run_command(MAINT_CMD + [f"--project={project}"], err_msg)
 
-    maint_nodes = res.stdout.split('\n')[:-1]
+    return json.loads(res.stdout)
 
-    return maint_nodes
+def get_maintenance_nodes(instances: List[dict]) -> List[str]:
+    maint_nodes = [i["name"] for i in instances
+                   if i.get("scheduling", {}).get("maintenanceInterval") ==
+                   "PERIODIC"]
 
-def get_upcoming_maintenance(project: str) -> List[str]:
-    err_msg = "Error getting upcoming maintenance list"
-    res = run_command(UPC_MAINT_CMD.format(project), err_msg)
+    return maint_nodes
 
-    upc_maint = [x.split() for x in res.stdout.split("\n")[:-1]]
+def get_upcoming_maintenance(instances: List[dict]) -> List[List[str]]:
+    upc_maint = []
+    for i in instances:
+        if "upcomingMaintenance" not in i:
+            continue
+        upc = i["upcomingMaintenance"]
+        window = upc.get("startTimeWindow", {})
+        upc_maint.append([i["name"], window.get("earliest", ""),
+                          window.get("latest", ""),
+                          str(upc.get("canReschedule", "")),
+                          upc.get("type", "")])
 
     return upc_maint
 
@@ -86,21 +101,28 @@ class NodeMaintenance:
         self.project = project
         self.regex = regex
         self.slurm_nodes = slurm_nodes
+        self.instances = None
         self.per_maint_vms = None
         self.upc_maint_vms = None
 
-    def update_maintenance_nodes(self) -> None:
-        per_maint_vms = get_maintenance_nodes(self.project)
+    def update_instances(self) -> None:
+        '''Refreshes the instance listing and both maintenance views'''
+        self.instances = get_maintenance_instances(self.project)
+        self.per_maint_vms = self._filter_maintenance_nodes()
+        self.upc_maint_vms = self._filter_upcoming_maintenance()
+
+    def _filter_maintenance_nodes(self) -> List[str]:
+        per_maint_vms = get_maintenance_nodes(self.instances)
         if self.regex:
             per_maint_vms = list(filter(self.regex.search, per_maint_vms))
 
         if self.slurm_nodes:
             per_maint_vms = list(set(per_maint_vms) & set(self.slurm_nodes))
-        
-        self.per_maint_vms = per_maint_vms
 
-    def update_upcoming_maintenance(self) -> None:
-        upc_maint_vms = get_upcoming_maintenance(self.project)
+        return per_maint_vms
+
+    def _filter_upcoming_maintenance(self) -> List[List[str]]:
+        upc_maint_vms = get_upcoming_maintenance(self.instances)
         if self.regex:
             upc_maint_vms = list(filter(lambda x: self.regex.match(x[0]),
                                   upc_maint_vms))
@@ -109,11 +131,11 @@ class NodeMaintenance:
             upc_maint_vms = [u for u in upc_maint_vms if u[0] in
                               self.slurm_nodes]
 
-        self.upc_maint_vms = upc_maint_vms
+        return upc_maint_vms
 
     def print_maintenance_nodes(self) -> None:
-        if self.per_maint_vms is None:
-            self.update_maintenance_nodes()
+        if self.instances is None:
+            self.update_instances()
 
         if not self.per_maint_vms:
             print("No nodes with periodic maintenance\n")
@@ -125,8 +147,8 @@ class NodeMaintenance:
         print()
 
     def print_upcoming_maintenance(self) -> None:
-        if self.upc_maint_vms is None:
-            self.update_upcoming_maintenance()
+        if self.instances is None:
+            self.update_instances()
 
         if not self.upc_maint_vms:
             print("No upcoming maintenance\n")
@@ -141,11 +163,10 @@ class NodeMaintenance:
         print()
 
 def node_maintenace_factory(project: str, regex: str = None,
-                            check_maint: bool = False,
                             slurm: bool = False) -> NodeMaintenance:
     err_msg = f"{project} does not exist or you may not have permission to" \
               " access it"
-    res = run_command(PRJ_CMD.format(project), err_msg)
+    res = run_command(PRJ_CMD + [project], err_msg)
 
     compiled_regex = None
     if regex:
@@ -162,9 +183,7 @@ def node_maintenace_factory(project: str, regex: str = None,
         slurm_nodes = res.stdout.split()
 
     maint = NodeMaintenance(project, compiled_regex, slurm_nodes)
-    if check_maint:
-        maint.update_maintenance_nodes()
-    maint.update_upcoming_maintenance()
+    maint.update_instances()
 
     return maint
 
@@ -172,8 +191,7 @@ def main(project: str, vm_regex: str = None, print_periodic_vms: bool = False,
          slurm: bool = False) -> None:
     check_gcloud_components()
 
-    maint = node_maintenace_factory(project, vm_regex, print_periodic_vms, 
-                                    slurm)
+    maint = node_maintenace_factory(project, vm_regex, slurm)
 
     if print_periodic_vms:
         maint.print_maintenance_nodes()